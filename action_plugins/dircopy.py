@@ -4,34 +4,83 @@ __metaclass__ = type
 
 from ansible.errors import AnsibleError
 from ansible.module_utils._text import to_native
+from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.plugins.action import ActionBase
 import os
+import shutil
 import subprocess
 import tarfile
-from time import time
-from datetime import datetime as dt
+import tempfile
+import zipfile
+from functools import lru_cache
 import errno
 
 
+VALID_MODE_DIGITS = frozenset("01234567")
+
+
+@lru_cache(maxsize=32)
 def check_file_mode(mode):
-    if len(mode) not in (3, 4) or not mode.isdigit():
-        return False, "Invalid mode"
+    if len(mode) not in (3, 4):
+        return None
     if len(mode) == 4:
         sticky = mode[:1]
         if sticky not in ('0', '1'):
-            return False
+            return None
     else:
         mode = "0" + mode
-    valid_modes = ('0', '1', '2', '4', '6', '7')
-    valid = all(m in valid_modes for m in mode)
-    return mode if valid else None
+    return mode if VALID_MODE_DIGITS.issuperset(mode) else None
 
 
-def timestamp():
-    return dt.fromtimestamp(int(time())).strftime('%Y-%m-%d_%H-%M-%S')
+COMPRESSIONS = ("none", "gzip", "zstd")
 
 
-TARFILE = "_dircopy_%s.tar" % timestamp()
+def compressor(compression):
+    if compression == "zstd":
+        return ["zstd", "-T0", "-3", "-c"]
+    # pigz compresses on all cores; fall back to the single-threaded gzip
+    return [shutil.which("pigz") or "gzip", "-c", "-1"]
+
+
+def create_archive(src, archive, compression="none"):
+    # Returns tar's warnings, if any. Its stderr goes to a file, not a pipe: the pipe would only be
+    # read after tar exits, so a tar with a lot to report could block on it.
+    with tempfile.TemporaryFile() as tar_err:
+        tar_p = subprocess.Popen(["tar", "-cf", "-", "-C", src, "."], stdout=subprocess.PIPE,
+                                 stderr=tar_err)
+        comp_rc = 0
+        try:
+            with open(archive, "wb") as out:
+                if compression != "none":
+                    comp_cmd = compressor(compression)
+                    comp_p = subprocess.Popen(comp_cmd, stdin=tar_p.stdout, stdout=out)
+                    tar_p.stdout.close()
+                    comp_rc = comp_p.wait()
+                else:
+                    shutil.copyfileobj(tar_p.stdout, out, 1 << 20)
+        finally:
+            tar_p.stdout.close()
+            tar_rc = tar_p.wait()
+        tar_err.seek(0)
+        tar_msg = to_native(tar_err.read()).strip()
+    # GNU tar exits with 1 when a file changed while it was being read; the archive is still
+    # complete, so (as before) that's only a warning. Anything else, a signal (negative rc) included,
+    # leaves a truncated archive.
+    if tar_rc not in (0, 1):
+        raise subprocess.CalledProcessError(tar_rc, "tar", stderr=tar_msg)
+    if comp_rc != 0:
+        raise subprocess.CalledProcessError(comp_rc, comp_cmd[0])
+    if tar_rc:
+        return tar_msg or "exited with status 1"
+    return None
+
+
+def remove_archive(archive):
+    try:
+        os.remove(archive)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise e
 
 
 class ActionModule(ActionBase):
@@ -52,9 +101,12 @@ class ActionModule(ActionBase):
         verbose = self._task.args.get('verbose', None)
         local_tmp = self._task.args.get('local_tmp', "/tmp/")
         gzip = self._task.args.get('gzip', False)
+        compression = self._task.args.get('compression', None)
 
         remote_user = task_vars.get('ansible_ssh_user') or self._play_context.remote_user
         source_is_directory = True
+        archive_format = "tar"
+        tar_warning = None
 
         # Parameter tests
         source = os.path.abspath(source)
@@ -66,13 +118,16 @@ class ActionModule(ActionBase):
             result["failed"] = True
             result["msg"] = "src does not exist."
         if not os.path.isdir(source):
+            # tar first: is_zipfile() also matches a tar whose last member is a zip
             try:
-                tarfile.open(source)
+                tarfile.open(source).close()
             except tarfile.ReadError as e:
-                result["failed"] = True
-                result["msg"] = "src must be a directory or a tar file"
-                result["error_msg"] = e
-                return result
+                if not zipfile.is_zipfile(source):
+                    result["failed"] = True
+                    result["msg"] = "src must be a directory, a tar or a zip file"
+                    result["error_msg"] = e
+                    return result
+                archive_format = "zip"
             source_is_directory = False
         try:
             src = self._find_needle('files', source)
@@ -81,6 +136,13 @@ class ActionModule(ActionBase):
             result['msg'] = to_native(e)
             return result
 
+        if compression is None:
+            compression = "gzip" if boolean(gzip, strict=False) else "none"
+        if compression not in COMPRESSIONS:
+            result["failed"] = True
+            result["msg"] = "compression must be one of: %s" % ", ".join(COMPRESSIONS)
+            return result
+
         if mode:
             mode = check_file_mode(mode)
             if not mode:
@@ -92,39 +154,40 @@ class ActionModule(ActionBase):
         if not remote_tmp:
             tmp = self._make_tmp_path(remote_user)
             self._cleanup_remote_tmp = True
-        tmpfile = os.path.join(tmp, TARFILE)
 
         if source_is_directory:
-            # tar the source
-            local_tmpfile = os.path.join(local_tmp, TARFILE)
-            src_dirname = src.split("/")[-2] if src[-1] == "/" else src.split("/")[-1]
-            gzip_flag = "z" if gzip else ""
-            cmd = "tar -c%sf %s *" % (gzip_flag, local_tmpfile)
+            # tar the source; a unique name per run, so parallel forks don't overwrite each other's archive
+            fd, local_tmpfile = tempfile.mkstemp(prefix="_dircopy_", suffix=".tar", dir=local_tmp)
+            os.close(fd)
             try:
-                _ = subprocess.call(cmd, cwd=os.path.abspath(src), shell=True, stderr=subprocess.PIPE)
-            except subprocess.CalledProcessError as e:
+                tar_warning = create_archive(os.path.abspath(src), local_tmpfile, compression=compression)
+            except (OSError, subprocess.CalledProcessError) as e:
+                remove_archive(local_tmpfile)
                 result['failed'] = True
                 result['msg'] = to_native(e)
+                if getattr(e, "stderr", None):
+                    result['msg'] += ": " + e.stderr
                 return result
 
         archive2transfer = local_tmpfile if source_is_directory else source
+        tarfile_name = os.path.basename(archive2transfer)
+        tmpfile = os.path.join(tmp, tarfile_name)
 
         remote_user = task_vars.get('ansible_ssh_user') or self._play_context.remote_user
         copy_module_args = self._task.args.copy()
-        xfered = self._transfer_file(archive2transfer, tmpfile)
+        try:
+            xfered = self._transfer_file(archive2transfer, tmpfile)
+        finally:
+            # the local archive is only a staging copy, drop it as soon as it has been sent
+            if source_is_directory:
+                remove_archive(local_tmpfile)
         self._fixup_perms2((tmp, xfered), remote_user)
-        if source_is_directory:
-            try:
-                os.remove(local_tmpfile)
-            except OSError as e:
-                if e.errno != errno.ENOENT:
-                    raise e
 
         copy_module_args.update(
             dict(
                 src=xfered,
                 dest=tmpfile,
-                original_basename=TARFILE,
+                original_basename=tarfile_name,
             ),
         )
 
@@ -145,7 +208,7 @@ class ActionModule(ActionBase):
 
         module_args = dict(dest=dest, src=src, owner=str(owner), group=str(group), mode=mode, identical=identical,
                            verbose=verbose, specialx=specialx, _tmpfile=xfered, source_is_directory=source_is_directory,
-                           _arch_root=arch_root
+                           _arch_root=arch_root, _archive_format=archive_format
                            )
 
         module_res = self._execute_module(
@@ -156,4 +219,6 @@ class ActionModule(ActionBase):
         )
 
         result.update(module_res)
+        if tar_warning:
+            result.setdefault('warnings', []).append("tar: %s" % tar_warning)
         return result
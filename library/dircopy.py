@@ -12,6 +12,7 @@ options:
   src:
     description:
       - Directory on the source host that will be copied to the destination; The path can be absolute or relative.
+        It can also be a tar or zip archive, whose content is copied.
     required: true
   dest:
     description:
@@ -44,6 +45,12 @@ options:
     description:
       - gzip the directory on transfer (applicable only on directory copying)
     default: False
+  compression:
+    description:
+      - compress the directory on transfer (applicable only on directory copying); C(gzip) uses pigz if it is
+        installed, C(zstd) compresses on all cores and needs zstd on both hosts. Overrides I(gzip).
+    choices: [ 'none', 'gzip', 'zstd' ]
+    default: 'gzip' if I(gzip) is set, otherwise 'none'
   specialx: 
     description:
       - set execution flag additionally to owner or group rights (in case owner/group/others have any right on target) 
@@ -52,7 +59,8 @@ options:
       - module exits with detailed information of updates, removals, etc. 
   
 notes:
-   - tar must be installed on both the local and remote host.
+   - tar must be installed on the local host; the remote side reads the archive with the Python tarfile module.
+   - If python-isal is installed on the remote host, gzipped archives are decompressed with ISA-L.
    - The module does not preserve the file ownership an permissions (you can set or it defaults to the Asible user 
      and the target's umask) 
    - The source cannot be "/"
@@ -71,44 +79,100 @@ dircopy:
     identical: yes
     
 dircopy: src=/tmp/test.tgz dest=/tmp/test
+
+dircopy: src=/tmp/test.zip dest=/tmp/test
 '''
 
 from ansible.module_utils.basic import *
 import os
 import pwd
 import grp
+import stat
 import subprocess
-from operator import itemgetter
+import tarfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
+
+try:
+    # ISA-L inflate is several times faster than zlib; used for gzipped archives when available
+    from isal import igzip, isal_zlib
+    HAS_ISAL = True
+except ImportError:
+    HAS_ISAL = False
+
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+# GNU tar-like extraction (strip leading "/", refuse paths outside dest) on Pythons that support filters
+EXTRACT_OPTS = dict(filter="tar") if hasattr(tarfile, "tar_filter") else dict()
+# What reading a damaged archive raises. EOFError: truncated gzip stream; IsalError: corrupt deflate data
+# on the ISA-L path (tarfile maps zlib's own error to ReadError, igzip's is a plain Exception).
+READ_ERRORS = (tarfile.TarError, OSError, EOFError) + ((isal_zlib.IsalError,) if HAS_ISAL else ())
+
+FileInfo = namedtuple("FileInfo", "path uid gid mode size")
+
+# chown/chmod/unlink block in the kernel with next to no CPU work, so they overlap well in threads
+FS_WORKERS = 16
+
+
+def run_parallel(func, items):
+    items = list(items)
+    if len(items) < 2:
+        # not worth starting threads for
+        for item in items:
+            func(item)
+        return
+    with ThreadPoolExecutor(max_workers=min(FS_WORKERS, len(items))) as executor:
+        for _ in executor.map(func, items):
+            pass
+
+
+def file_info(path, st=None):
+    if st is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+    return FileInfo(path, st.st_uid, st.st_gid, stat.S_IMODE(st.st_mode), st.st_size)
 
 
-class File(object):
-    def __init__(self, path):
-        path = os.path.abspath(path)
-        self.path = path if os.path.exists(path) else None
-        self.uid, self.gid, self.mode = self.get_rights()
+# Cached, as most entries share a handful of owners and every miss may be an LDAP/SSSD round trip.
+# Ids without an entry (e.g. extracted from the archive as-is) are shown numerically.
+@lru_cache(maxsize=None)
+def user_name(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
 
-    def get_rights(self):
-        if self.path:
-            st = os.stat(self.path)
-            mode = str(oct(st.st_mode))[-4:] if self.path else None
-            return st.st_uid, st.st_gid, mode
-        else:
-            return None, None, None
 
-    def size(self):
-        return os.stat(self.path).st_size if self.path else None
+@lru_cache(maxsize=None)
+def group_name(gid):
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
 
-    def set_owner(self, uid, gid):
-        os.chown(self.path, uid, gid)
 
-    def set_mode(self, mode):
-        os.chmod(self.path, int(mode, 8))
+def ownership(info):
+    return "{}/{}".format(user_name(info.uid), group_name(info.gid))
 
-    def get_owner_name(self):
-        return pwd.getpwuid(os.stat(self.path).st_uid).pw_name
 
-    def get_group_name(self):
-        return grp.getgrgid(os.stat(self.path).st_gid).gr_name
+def add_parent_dirs(files, dirs):
+    # an archive doesn't necessarily carry entries for the parent directories
+    # (dirs grows inside the loop, so only it needs a snapshot)
+    for path in chain(files, list(dirs)):
+        parent = path.rpartition("/")[0]
+        while parent and parent not in dirs:
+            dirs.add(parent)
+            parent = parent.rpartition("/")[0]
+    return dirs
 
 
 class TarFile(object):
@@ -117,147 +181,318 @@ class TarFile(object):
         self.module = ansible_module
         self.check_mode = self.module.check_mode
         self.self_created = self_created
-
-    @staticmethod
-    def _parse_tar_out(tar_out):
-        missing_files = set()
-        for line in tar_out.split("\n"):
-            if not line.strip():
-                continue
-            if "Cannot stat" in line:
-                missing_files.add(line.split(":")[1].strip())
-        return missing_files
-
-    def _runner(self, cmd):
-        (rc, stdout, error) = self.module.run_command(cmd, use_unsafe_shell=False)
-
-        if rc not in (0, 1):
-            self.module.fail_json(change=False, msg=error)
-        else:
-            return stdout + error
+        self._listing = None
+
+    @contextmanager
+    def _open(self, full_pass=False):
+        with open(self.tarfile, "rb") as f:
+            magic = f.read(4)
+        if HAS_ISAL and magic.startswith(GZIP_MAGIC):
+            with igzip.open(self.tarfile, "rb") as gz, tarfile.open(fileobj=gz, mode="r|") as tf:
+                yield tf
+            return
+        if magic != ZSTD_MAGIC:
+            with tarfile.open(self.tarfile, "r|*") as tf:
+                yield tf
+            return
+        # tarfile can't decompress zstd itself, stream it through the zstd binary
+        try:
+            zstd_p = subprocess.Popen(["zstd", "-dcq", self.tarfile], stdout=subprocess.PIPE)
+        except OSError as e:
+            self.module.fail_json(changed=False, msg="%s is a zstd archive but zstd could not be run on the "
+                                                     "remote host (is it installed?): %s" % (self.tarfile, str(e)))
+        try:
+            with tarfile.open(fileobj=zstd_p.stdout, mode="r|") as tf:
+                yield tf
+            if full_pass:
+                # drain the trailing padding, so zstd isn't killed by SIGPIPE writing it
+                while zstd_p.stdout.read(1 << 20):
+                    pass
+        finally:
+            zstd_p.stdout.close()
+            zstd_rc = zstd_p.wait()
+        # a broken stream may end on a member boundary and look like a complete archive to tarfile;
+        # only checked after a full pass, as an early stop (see _select) kills zstd with SIGPIPE
+        if full_pass and zstd_rc != 0:
+            self.module.fail_json(changed=False, msg="Decompressing %s failed: zstd exited with %s"
+                                                     % (self.tarfile, zstd_rc))
+
+    def members(self):
+        # Streams the headers in a single pass over the (possibly compressed) archive. tarfile
+        # keeps every TarInfo it has read, so they are dropped as the pass goes; only the
+        # (name, isdir) pairs are kept, for a later list() not to decompress the stream again.
+        listing = list()
+        try:
+            with self._open(full_pass=True) as tf:
+                member = tf.next()
+                while member is not None:
+                    del tf.members[:]
+                    listing.append((member.name, member.isdir()))
+                    yield member
+                    member = tf.next()
+        except READ_ERRORS as e:
+            self.module.fail_json(changed=False, msg="Reading %s failed: %s" % (self.tarfile, str(e)))
+        self._listing = listing
 
     def list(self):
-        stdout = self._runner("tar -tvf %s" % self.tarfile)
-        if stdout:
-            lines = filter(None, [line for line in stdout.split("\n")])
-            tar_listed_dirs = [" ".join(line.split()[5:]) for line in lines if line.split()[0][:1] == "d"]
-            # tar doesn't list directories contain no file, so
-            unlisted_dirs = [set(d.split("/")[:-1]) for d in tar_listed_dirs if "/" in d]
-            unlisted_dirs = set.union(*unlisted_dirs)
-            if unlisted_dirs:
-                dirs = set.union(unlisted_dirs, set(tar_listed_dirs))
-            else:
-                unlisted_dirs = set([])
-            paths = set(self._remove_leading_slash([" ".join(line.split()[5:]) for line in lines]))
-            files = paths - dirs
-            return files, dirs
-        return None, None
+        if self._listing is None:
+            for _ in self.members():
+                pass
+        files = set()
+        dirs = set()
+        for name, isdir in self._listing:
+            (dirs if isdir else files).add(name.lstrip("/"))
+        return files, add_parent_dirs(files, dirs)
 
     @staticmethod
-    def _remove_leading_slash(a_list):
-        for i, item in enumerate(a_list):
-            if item.startswith("/"):
-                a_list[i] = item[1:]
-        return a_list
+    def _select(tf, names):
+        # stop as soon as the last wanted member is out: the rest of the stream needn't be read
+        pending = set(names)
+        for member in tf:
+            if member.name in pending:
+                pending.discard(member.name)
+                yield member
+                if not pending:
+                    return
 
     @staticmethod
-    def _add_leading_slash(a_list):
-        for i, item in enumerate(a_list):
-            item = item.strip()
-            if not item.startswith("/"):
-                a_list[i] = "/" + item
-        return a_list
+    def _contained(members, target):
+        # what the "tar" filter does on the Pythons that have it: strip a leading "/" and refuse
+        # anything that would land outside of target
+        root = os.path.abspath(target)
+        for member in members:
+            member.name = member.name.lstrip("/")
+            path = os.path.normpath(os.path.join(root, member.name))
+            if path != root and not path.startswith(root + "/"):
+                raise tarfile.TarError("%s would be extracted outside of %s" % (member.name, target))
+            yield member
+
+    def _extract(self, target, names=None):
+        try:
+            with self._open(full_pass=names is None) as tf:
+                members = tf if names is None else self._select(tf, names)
+                if not EXTRACT_OPTS:
+                    members = self._contained(members, target)
+                tf.extractall(target, members=members, **EXTRACT_OPTS)
+        except READ_ERRORS as e:
+            self.module.fail_json(changed=False, msg="Extracting %s failed: %s" % (self.tarfile, str(e)))
 
     def untar(self, target):
         if self.check_mode:
             return
-        command = "tar --preserve-permissions -xf %s -C %s" % (self.tarfile, target)
-        self._runner(command)
+        self._extract(target)
+
+    @staticmethod
+    def _differs(member, path):
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return True
+        if member.isdir():
+            return not stat.S_ISDIR(st.st_mode)
+        if member.issym():
+            return not stat.S_ISLNK(st.st_mode) or os.readlink(path) != member.linkname
+        if member.isfile():
+            return (not stat.S_ISREG(st.st_mode) or st.st_size != member.size
+                    or int(st.st_mtime) != int(member.mtime))
+        return False
+
+    def compare(self, target):
+        # metadata only (size, mtime, link target): the file contents are not read back
+        differ = set()
+        for member in self.members():
+            # a leading "/" is stripped on extraction, so it must not make the path absolute here
+            # either; the raw name is kept, as that's what _select matches
+            if self._differs(member, os.path.join(target, member.name.lstrip("/"))):
+                differ.add(member.name)
+        return differ
+
+    def update(self, target, files2update):
+        if self.check_mode:
+            return
+        # one sequential pass over the archive extracts the whole change set
+        self._extract(target, names=set(files2update))
+
+
+class ZipFile(object):
+    # Same interface as TarFile. A zip has a central directory, so members are extracted
+    # independently (and in parallel) instead of in one sequential pass.
+    def __init__(self, path, ansible_module, self_created=False):
+        self.zipfile = path
+        self.module = ansible_module
+        self.check_mode = self.module.check_mode
+        self.self_created = self_created
+        self._members = None
+
+    def members(self):
+        if self._members is None:
+            try:
+                with zipfile.ZipFile(self.zipfile) as zf:
+                    self._members = zf.infolist()
+            except (zipfile.BadZipfile, OSError) as e:
+                self.module.fail_json(changed=False, msg="Reading %s failed: %s" % (self.zipfile, str(e)))
+        return self._members
+
+    @staticmethod
+    def _mtime(member):
+        return int(time.mktime(member.date_time + (0, 0, -1)))
+
+    def list(self):
+        files = set()
+        dirs = set()
+        for member in self.members():
+            (dirs if member.is_dir() else files).add(member.filename.strip("/"))
+        return files, add_parent_dirs(files, dirs)
 
     def compare(self, target):
-        command = "tar --compare --file %s -C %s" % (self.tarfile, target)
-        tar_out = self._runner(command)
-        if tar_out:
-            return self._parse_tar_out(tar_out.strip())
-        return None
+        differ = set()
+        for member in self.members():
+            try:
+                st = os.lstat(os.path.join(target, member.filename.lstrip("/")))
+            except OSError:
+                differ.add(member.filename)
+                continue
+            if member.is_dir():
+                if not stat.S_ISDIR(st.st_mode):
+                    differ.add(member.filename)
+            # zip timestamps have a two second resolution; _extract stamps files with the rounded value
+            elif (not stat.S_ISREG(st.st_mode) or st.st_size != member.file_size
+                  or int(st.st_mtime) != self._mtime(member)):
+                differ.add(member.filename)
+        return differ
+
+    def _extract(self, target, names):
+        # a ZipFile object keeps a file position, so every worker thread opens its own
+        handles = threading.local()
+        opened = list()
+
+        def extract(member):
+            if not hasattr(handles, "zf"):
+                handles.zf = zipfile.ZipFile(self.zipfile)
+                opened.append(handles.zf)
+            path = handles.zf.extract(member, target)
+            if not member.is_dir():
+                mtime = self._mtime(member)
+                os.utime(path, (mtime, mtime))
+
+        members = [m for m in self.members() if names is None or m.filename in names]
+        try:
+            # directories first and serially, so the workers never race on creating a parent
+            root = os.path.abspath(target)
+            for member in members:
+                path = os.path.normpath(os.path.join(root, member.filename.lstrip("/")))
+                if path != root and not path.startswith(root + "/"):
+                    raise zipfile.BadZipfile("%s would be extracted outside of %s" % (member.filename, target))
+                if not member.is_dir():
+                    path = os.path.dirname(path)
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+            run_parallel(extract, [m for m in members if not m.is_dir()])
+        except (zipfile.BadZipfile, OSError, RuntimeError, NotImplementedError) as e:
+            # RuntimeError: encrypted member, NotImplementedError: unsupported compression method
+            self.module.fail_json(changed=False, msg="Extracting %s failed: %s" % (self.zipfile, str(e)))
+        finally:
+            for zf in opened:
+                zf.close()
+
+    def untar(self, target):
+        if self.check_mode:
+            return
+        self._extract(target, names=None)
 
     def update(self, target, files2update):
-        files, dirs = self.list()
         if self.check_mode:
             return
-        self._add_leading_slash(list(files2update))
-        for f in files2update:
-            command = ['tar', '-xf', self.tarfile, "-C", target, f]
-            _ = self._runner(command)
-
-
-def umask2mode(umask):
-    perms = [i.split("=")[1] for i in umask.split(",")]
-    perms = ["-" if not i else i for i in perms]
-    to_num = lambda x: x.replace("r", "4").replace("w", "2").replace("x", "1").replace("-", "0")
-    mode_num = lambda x: sum([int(i) for i in to_num(x)])
-    mode_string = "".join([str(mode_num(i)) for i in perms])
-    return mode_string
-
-
-def check_permissions(dest, uid, gid, perms, dir_perms):
-    dest_files, dest_dirs = get_files(dest)
-    files = [File(os.path.abspath(f)) for f in dest_files]
-    files = [f for f in files if f.path]
-    dirs = [File(os.path.abspath(d)) for d in dest_dirs]
-    dirs = [d for d in dirs if d.path]
-    files_ownership2update = set([f for f in files if (f.uid != uid)] + [f for f in files if (f.gid != gid)])
-    dirs_ownership2update = set([d for d in dirs if (d.uid != uid or d.gid != gid)])
-    ownership2update = list(files_ownership2update) + list(dirs_ownership2update)
-    files_mode2update = [f for f in files if f.mode != perms]
-    dirs_mode2update = [d for d in dirs if d.mode != dir_perms]
+        self._extract(target, names=set(files2update))
+
+
+def check_permissions(dest_stats, uid, gid, perms, dir_perms):
+    ownership2update = list()
+    files_mode2update = list()
+    dirs_mode2update = list()
+    perms = int(perms, 8)
+    dir_perms = int(dir_perms, 8)
+
+    for file_object, is_dir in dest_stats:
+        if file_object.uid != uid or file_object.gid != gid:
+            ownership2update.append(file_object)
+        if is_dir:
+            if file_object.mode != dir_perms:
+                dirs_mode2update.append(file_object)
+        elif file_object.mode != perms:
+            files_mode2update.append(file_object)
     return ownership2update, files_mode2update, dirs_mode2update
 
 
-def get_files(target):
+def scan_tree(target):
+    # Yields (entry, is_dir) for everything below target. DirEntry objects cache their stat
+    # result and entry.path is already absolute when target is, so one scandir pass serves
+    # both the listing and the permission checks.
+    stack = [target]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            # unreadable directory: listed by its parent but not descended into (as with os.walk)
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    yield entry, True
+                elif not entry.is_dir():
+                    # symlinks to directories are neither followed nor listed (as with os.walk)
+                    yield entry, False
+
+
+def walk_with_stats(target):
+    # the files and dirs below target plus the (FileInfo, is_dir) of every entry, so a single
+    # traversal of dest can serve both make_identical and check_permissions
+    target = os.path.abspath(target)
     files = set()
-    dirs = list()
-    for path, sub_dirs, _files in os.walk(target):
-        if os.path.isdir(path):
-            dirs.append(path)
-        for name in _files:
-            files.add(os.path.abspath(os.path.join(path, name)))
-    # Correct path endings
-    for i, d in enumerate(dirs):
-        dirs[i] = os.path.abspath(d)
-    return files, set(dirs)
+    dirs = set([target])
+    stats = [(file_info(target), True)]
+    for entry, is_dir in scan_tree(target):
+        (dirs if is_dir else files).add(entry.path)
+        try:
+            st = entry.stat()
+        except OSError:
+            # dangling symlink
+            continue
+        stats.append((file_info(entry.path, st), is_dir))
+    return files, dirs, stats
 
 
 def perms_with_exec(mode_string):
-    sticky_bit = mode_string[:1] if len(mode_string) == 4 else ""
-    modes = [m for m in mode_string[-3:]]
-    new_mode_string = sticky_bit
-    for m in modes:
-        mode = int(m)
-        if mode % 2 == 0:
-            mode = mode + 1 if mode else 0
-        new_mode_string += str(mode)
-    return new_mode_string
-
-
-def make_identical(target, tarfile):
+    # add the x bit to every (owner, group, other) triad that has any right
+    mode = int(mode_string, 8)
+    for shift in (0, 3, 6):
+        if (mode >> shift) & 0o6:
+            mode |= 1 << shift
+    return "%04o" % mode
+
+
+def make_identical(target, tarfile, target_files, target_dirs):
+    target = os.path.abspath(target)
+    prefix = target.rstrip("/") + "/"
     (files_in_tar, dirs_in_tar) = tarfile.list()
-    files_in_tar = set([os.path.abspath(target + f) for f in files_in_tar])
-    dirs_in_tar = set([os.path.abspath(target + f) for f in dirs_in_tar])
-    (target_files, target_dirs) = get_files(target)
+    # member names are relative (possibly "./"-prefixed); normpath is a pure string operation
+    files_in_tar = {os.path.normpath(prefix + f) for f in files_in_tar}
+    dirs_in_tar = {os.path.normpath(prefix + d) for d in dirs_in_tar}
     spare_files = target_files - files_in_tar
-    spare_dirs = target_dirs - dirs_in_tar - set([os.path.abspath(target)])
+    spare_dirs = target_dirs - dirs_in_tar - {target}
     return spare_files, spare_dirs
 
 
 def remove_spares(files, dirs):
-    for f in files:
-        os.remove(os.path.join(f))
-    dirs_with_path_length = zip(list(dirs), [len(d.split("/")) for d in dirs])
-    dirs_sorted_by_path = sorted(dirs_with_path_length, key=itemgetter(1), reverse=True)
-    for d in dirs_sorted_by_path:
+    try:
+        run_parallel(os.remove, files)
+    except OSError as e:
+        return e
+    # deepest first, so every directory is already empty when it is removed
+    for d in sorted(dirs, key=lambda p: p.count("/"), reverse=True):
         try:
-            os.rmdir(d[0])
+            os.rmdir(d)
         except OSError as e:
             return e
     return None
@@ -276,7 +511,8 @@ def main():
         "remote_tmp": dict(default="/tmp"),
         "specialx": dict(default=False, type='bool'),
         "_tmpfile": dict(required=False),
-        "source_is_directory": dict(required=True),
+        "source_is_directory": dict(required=True, type='bool'),
+        "_archive_format": dict(default="tar", choices=["tar", "zip"]),
     }
 
     module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
@@ -293,18 +529,20 @@ def main():
     identical = params["identical"]
     verbose = params["verbose"]
     specialx = params["specialx"]
-    source_is_directory = ["source_is_directory"]
+    source_is_directory = params["source_is_directory"]
     tmpdir = params["remote_tmp"]
     tmpfile = os.path.join(tmpdir, params["_tmpfile"])
 
+    user = None
     if owner:
         if owner.isdigit():
             uid = int(owner)
         else:
             try:
-                uid = pwd.getpwnam(owner).pw_uid
+                user = pwd.getpwnam(owner)
             except KeyError:
                 module.exit_json(failed=True, changed=False, msg="No such a user: %s" % owner)
+            uid = user.pw_uid
     if group:
         if group.isdigit():
             gid = int(group)
@@ -314,13 +552,16 @@ def main():
             except KeyError:
                 module.exit_json(failed=True, changed=False, msg="No such a group: %s" % group)
     else:
-        gid = pwd.getpwnam(owner).pw_gid
+        gid = (user or pwd.getpwuid(uid)).pw_gid
 
+    dir_mode = None
     if not mode:
-        umask = subprocess.check_output(["umask", "-S"])
-        mode = umask2mode(umask.strip())
+        # the modes newly created files and directories get under the current umask
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = "%04o" % (0o666 & ~umask)
+        dir_mode = "%04o" % (0o777 & ~umask)
 
-    failed = False
     changed = False
     files2update = None
     removed = False
@@ -333,35 +574,40 @@ def main():
     diff_updated_ownership_before = dict()
     diff_updated_mode_before = dict()
 
-    tarfile = TarFile(path=tmpfile, ansible_module=module)
+    # detected on the controller, where zips with a prefix (.pyz, self-extracting) are accepted too
+    archive_class = ZipFile if params["_archive_format"] == "zip" else TarFile
+    archive = archive_class(path=tmpfile, ansible_module=module)
 
-    exit_cmd = "module.exit_json(failed=failed, changed=changed, msg=dict(enumerate(msg)), diff=diff"
+    exit_kwargs = dict()
     if os.path.exists(dest):
         _update_msg = "differ(s)" if check_mode else "updated"
         if not os.path.isdir(dest):
-            failed = True
-            msg = "Destination (%s) is not a directory" % dest
-            eval(exit_cmd)
-        elif os.listdir(dest) != "":
-            files2update = tarfile.compare(target=dest)
+            module.exit_json(failed=True, changed=False, msg="Destination (%s) is not a directory" % dest)
+        else:
+            files2update = archive.compare(target=dest)
             if files2update:
                 changed = True
-                for f in files2update:
-                    file_object = File(path=os.path.join(dest, f))
-                    diff['before']['updated'][os.path.join(dest, f)] = file_object.size()
-                tarfile.update(target=dest, files2update=files2update)
-                updated = set([os.path.join(dest, d) for d in files2update])
+                updated = {os.path.normpath(os.path.join(dest, f.lstrip("/"))) for f in files2update}
+                for f in updated:
+                    info = file_info(f)
+                    diff['before']['updated'][f] = info.size if info else None
+                archive.update(target=dest, files2update=files2update)
 
+                # one stat per path and phase: before the update for the size, after it for the rest
                 for f in updated:
-                    file_object = File(path=f)
-                    diff_updated_ownership_before[f] = "{}/{}".format(file_object.get_owner_name(),
-                                                                      file_object.get_group_name())
-                    diff_updated_mode_before[f] = file_object.mode
-                    diff['after']['updated'][f] = file_object.size()
+                    info = file_info(f)
+                    if not info:
+                        continue
+                    diff_updated_ownership_before[f] = ownership(info)
+                    diff_updated_mode_before[f] = "%04o" % info.mode
+                    diff['after']['updated'][f] = info.size
                 msg.append("%s file(s) %s " % (len(files2update), _update_msg))
 
-        if identical and os.listdir(dest) != "":
-            spare_files, spare_dirs = make_identical(target=dest, tarfile=tarfile)
+        # one walk of the (updated) dest, shared by the spare detection and the permission check
+        dest_files, dest_dirs, dest_stats = walk_with_stats(dest)
+        if identical:
+            spare_files, spare_dirs = make_identical(target=dest, tarfile=archive,
+                                                     target_files=dest_files, target_dirs=dest_dirs)
             if (spare_files or spare_dirs) and not check_mode:
                 failed2remove = remove_spares(files=spare_files, dirs=spare_dirs)
                 if failed2remove:
@@ -377,21 +623,24 @@ def main():
                     else:
                         diff['before']['removed'] = removed
                     diff['after']['would_be_removed'] = []
+                dest_stats = [entry for entry in dest_stats if entry[0].path not in removed]
 
-        dir_mode = perms_with_exec(mode) if specialx else mode
-        ownership2update, files_mode2update, dirs_mode2update = check_permissions(dest=dest, uid=uid, gid=gid,
+        if not dir_mode:
+            dir_mode = perms_with_exec(mode) if specialx else mode
+        ownership2update, files_mode2update, dirs_mode2update = check_permissions(dest_stats=dest_stats,
+                                                                                  uid=uid, gid=gid,
                                                                                   perms=mode, dir_perms=dir_mode)
 
         if ownership2update:
             changed = True
             ownership_before = dict()
             ownership_after = dict()
+            new_ownership = "{}/{}".format(user_name(uid), group_name(gid))
             for file_object in ownership2update:
-                ownership_before[file_object.path] = "{}/{}".\
-                    format(file_object.get_owner_name(), file_object.get_group_name())
-                ownership_after[file_object.path] = "{}/{}".format(pwd.getpwuid(uid).pw_name, grp.getgrgid(gid).gr_name)
-                if not check_mode:
-                    file_object.set_owner(uid, gid)
+                ownership_before[file_object.path] = ownership(file_object)
+                ownership_after[file_object.path] = new_ownership
+            if not check_mode:
+                run_parallel(lambda f: os.chown(f.path, uid, gid), ownership2update)
             diff['before']['ownership'] = ownership_before
             diff['after']['ownership'] = ownership_after
             diff['before']['ownership'].update(diff_updated_ownership_before)
@@ -400,20 +649,22 @@ def main():
         diff['after']['mode'] = dict()
         mode_before = diff_updated_mode_before
         mode_after = dict()
+        file_perms = int(mode, 8)
+        dir_perms = int(dir_mode, 8)
         if files_mode2update:
             changed = True
             for file_object in files_mode2update:
-                mode_before[file_object.path] = file_object.mode
+                mode_before[file_object.path] = "%04o" % file_object.mode
                 mode_after[file_object.path] = mode
-                if not check_mode:
-                    file_object.set_mode(mode)
+            if not check_mode:
+                run_parallel(lambda f: os.chmod(f.path, file_perms), files_mode2update)
         if dirs_mode2update:
             changed = True
             for directory in dirs_mode2update:
-                mode_before[directory.path] = directory.mode
+                mode_before[directory.path] = "%04o" % directory.mode
                 mode_after[directory.path] = dir_mode
-                if not check_mode:
-                    directory.set_mode(dir_mode)
+            if not check_mode:
+                run_parallel(lambda d: os.chmod(d.path, dir_perms), dirs_mode2update)
         if files_mode2update or dirs_mode2update:
             diff['before']['mode'].update(mode_before)
             diff['after']['mode'].update(mode_after)
@@ -427,33 +678,39 @@ def main():
                 msg.append("%s file/dir ownership %s" % (len(ownership2update), _update_msg))
             if removed:
                 if check_mode:
-                    exit_cmd += ", would_be_removed=list(removed)"
+                    exit_kwargs['would_be_removed'] = list(removed)
                 else:
-                    exit_cmd += ", removed=list(removed)"
+                    exit_kwargs['removed'] = list(removed)
             if updated:
                 if check_mode:
-                    exit_cmd += ", files_to_update=list(updated)"
+                    exit_kwargs['files_to_update'] = list(updated)
                 else:
-                    exit_cmd += ", updated_files=list(updated)"
-        exit_cmd += ")"
-        eval(exit_cmd)
+                    exit_kwargs['updated_files'] = list(updated)
+        module.exit_json(failed=False, changed=changed, msg=dict(enumerate(msg)), diff=diff, **exit_kwargs)
 
     # Target doesn't exist -> untar
     if not check_mode:
         os.mkdir(dest)
-        tarfile.untar(target=dest)
-        check_permissions(dest=dest, uid=uid, gid=gid, perms=mode)
+        archive.untar(target=dest)
+        if not dir_mode:
+            dir_mode = perms_with_exec(mode) if specialx else mode
+        ownership2update, files_mode2update, dirs_mode2update = check_permissions(dest_stats=walk_with_stats(dest)[2],
+                                                                                  uid=uid, gid=gid,
+                                                                                  perms=mode, dir_perms=dir_mode)
+        file_perms = int(mode, 8)
+        dir_perms = int(dir_mode, 8)
+        run_parallel(lambda f: os.chown(f.path, uid, gid), ownership2update)
+        run_parallel(lambda f: os.chmod(f.path, file_perms), files_mode2update)
+        run_parallel(lambda d: os.chmod(d.path, dir_perms), dirs_mode2update)
         changed = True
         _msg = "copied" if source_is_directory else "extracted"
-        msg = "%s %s to %s " % (src, _msg, dest)
-        updated = True
+        msg = ["%s %s to %s " % (src, _msg, dest)]
         if verbose:
-            exit_cmd += ", 'extracted'=updated)"
+            exit_kwargs['extracted'] = True
     else:
-        msg = "Target directory does not exists."
-    failed = False
+        msg = ["Target directory does not exists."]
 
-    eval(exit_cmd)
+    module.exit_json(failed=False, changed=changed, msg=dict(enumerate(msg)), diff=diff, **exit_kwargs)
 
 if __name__ == '__main__':
     main()